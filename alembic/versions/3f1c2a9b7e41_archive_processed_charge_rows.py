@@ -0,0 +1,61 @@
+"""archive processed charge_rows
+
+Revision ID: 3f1c2a9b7e41
+Revises: d6573d70bcea
+Create Date: 2026-10-19 10:12:31.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7e41'
+down_revision = 'd6573d70bcea'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('archived_debts',
+    sa.Column('debt_id', sa.String(), nullable=False),
+    sa.Column('archive_month', sa.String(length=7), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('debt_id')
+    )
+    # Let Postgres cascade csv_files deletes instead of the ORM. The key is
+    # re-added NOT VALID so swapping it only holds the ACCESS EXCLUSIVE lock
+    # briefly; existing rows are validated below without blocking writes.
+    op.drop_constraint('charge_rows_csv_file_id_fkey', 'charge_rows', type_='foreignkey')
+    op.create_foreign_key(
+        'charge_rows_csv_file_id_fkey', 'charge_rows', 'csv_files',
+        ['csv_file_id'], ['id'], ondelete='CASCADE', postgresql_not_valid=True
+    )
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_charge_rows_processed_updated_at',
+            'charge_rows',
+            ['updated_at', 'id'],
+            unique=False,
+            postgresql_where=sa.text("status = 'PROCESSED'"),
+            postgresql_concurrently=True,
+        )
+        op.execute('ALTER TABLE charge_rows VALIDATE CONSTRAINT charge_rows_csv_file_id_fkey')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_charge_rows_processed_updated_at',
+            table_name='charge_rows',
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint('charge_rows_csv_file_id_fkey', 'charge_rows', type_='foreignkey')
+    op.create_foreign_key(
+        'charge_rows_csv_file_id_fkey', 'charge_rows', 'csv_files',
+        ['csv_file_id'], ['id'], postgresql_not_valid=True
+    )
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE charge_rows VALIDATE CONSTRAINT charge_rows_csv_file_id_fkey')
+    op.drop_table('archived_debts')
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Date, Numeric, Enum, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Date, Numeric, Enum, DateTime, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -20,12 +20,16 @@ class CSVFile(Base):
     fingerprint = Column(String, unique=True, nullable=False)
     filename = Column(String, nullable=False)
     upload_date = Column(DateTime, default=datetime.utcnow)
-    charge_rows = relationship("ChargeRow", back_populates="csv_file", cascade="all, delete-orphan")
+    # Child rows are removed by the database (ON DELETE CASCADE) instead of being
+    # loaded and deleted one by one through the ORM.
+    charge_rows = relationship(
+        "ChargeRow", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True
+    )
 
 class ChargeRow(Base):
     __tablename__ = "charge_rows"
     id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    csv_file_id = Column(PG_UUID(as_uuid=True), ForeignKey("csv_files.id"), nullable=False)
+    csv_file_id = Column(PG_UUID(as_uuid=True), ForeignKey("csv_files.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(100), nullable=False)
     government_id = Column(String, nullable=False)
     email = Column(String, nullable=False)
@@ -36,4 +40,26 @@ class ChargeRow(Base):
     error = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    csv_file = relationship("CSVFile", back_populates="charge_rows") 
\ No newline at end of file
+    csv_file = relationship("CSVFile", back_populates="charge_rows")
+
+    __table_args__ = (
+        # Partial index used by the archival job to find old processed rows
+        # without scanning the pending/failed part of the table.
+        Index(
+            "ix_charge_rows_processed_updated_at",
+            "updated_at",
+            "id",
+            postgresql_where=(status == ChargeStatus.PROCESSED),
+        ),
+    )
+
+class ArchivedDebt(Base):
+    """
+    Lightweight record of a charge row that was moved out of `charge_rows`
+    into an archive file. Only the debt_id is kept hot so duplicate debts
+    are still rejected on new uploads.
+    """
+    __tablename__ = "archived_debts"
+    debt_id = Column(String, primary_key=True)
+    archive_month = Column(String(7), nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,166 @@
+import enum
+import gzip
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Sequence
+from uuid import UUID
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db import SessionLocal, engine
+from app.models import ArchivedDebt, ChargeRow, ChargeStatus
+
+logger = logging.getLogger(__name__)
+
+# Key of the transaction-scoped advisory lock that serializes archive batches
+# (exclusive) against CSV batch inserts (shared). See CSVProcessor._insert_batch.
+ARCHIVE_LOCK_KEY = 0x6368_6172
+
+
+def archive_month(row: Mapping[str, Any]) -> str:
+    """Return the YYYY-MM bucket a processed row is archived under."""
+    return row["updated_at"].strftime("%Y-%m")
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def write_archive_chunk(archive_dir: str, month: str, rows: Sequence[Mapping[str, Any]]) -> str:
+    """
+    Write rows as gzip-compressed NDJSON under `<archive_dir>/<month>/`.
+
+    The file name is derived from the first row id, so re-running a batch that
+    failed before its delete was committed overwrites the same chunk instead
+    of duplicating it. The file is written to a temporary path and renamed
+    into place, so a crash never leaves a partial chunk behind. Both the file
+    and its directory are fsynced before returning, so the chunk is durable
+    before the caller deletes the source rows.
+    """
+    month_dir = os.path.join(archive_dir, month)
+    os.makedirs(month_dir, exist_ok=True)
+    path = os.path.join(month_dir, f"charge_rows-{rows[0]['id']}.ndjson.gz")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.open(raw, "wt", encoding="utf-8") as fh:
+            for row in rows:
+                fh.write(json.dumps({key: _serialize(value) for key, value in row.items()}))
+                fh.write("\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(month_dir)
+    return path
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ChargeRowArchiver:
+    """
+    Moves PROCESSED charge rows older than the retention window out of the
+    hot `charge_rows` table into monthly compressed archive files.
+
+    Each batch is selected in (updated_at, id) order, written to disk, recorded
+    in `archived_debts` and deleted with a single set-based DELETE, all before
+    one commit. An interrupted run can simply be started again.
+
+    Deleted rows stay in `charge_rows` and its indexes as dead tuples until
+    they are vacuumed. A run that archived anything ends with
+    `VACUUM (ANALYZE) charge_rows`, so the space is reused right away and the
+    working set shrinks without waiting for autovacuum.
+    """
+    def __init__(self):
+        self.BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 5000))
+        self.RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", 90))
+        self.ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+    def run(self) -> Dict[str, Any]:
+        cutoff = datetime.utcnow() - timedelta(days=self.RETENTION_DAYS)
+        stats = {
+            "archived_rows": 0,
+            "batches": 0,
+            "files": 0
+        }
+        session = SessionLocal()
+        try:
+            while True:
+                archived, files = self._archive_batch(session, cutoff)
+                if not archived:
+                    break
+                stats["archived_rows"] += archived
+                stats["batches"] += 1
+                stats["files"] += files
+                if archived < self.BATCH_SIZE:
+                    break
+
+            if stats["archived_rows"]:
+                self._vacuum()
+
+            logger.info(
+                "Archived %d charge rows into %d files in %d batches (cutoff %s)",
+                stats["archived_rows"], stats["files"], stats["batches"], cutoff.isoformat()
+            )
+            return stats
+        finally:
+            session.close()
+
+    def _vacuum(self) -> None:
+        # VACUUM cannot run inside a transaction block.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM (ANALYZE) charge_rows"))
+
+    def _archive_batch(self, session, cutoff: datetime):
+        table = ChargeRow.__table__
+        # Block new CSV batch inserts until this batch is committed, so none of
+        # them can check archived_debts before our insert and write to
+        # charge_rows after our delete.
+        session.execute(select(func.pg_advisory_xact_lock(ARCHIVE_LOCK_KEY)))
+        rows = session.execute(
+            select(table)
+            .where(table.c.status == ChargeStatus.PROCESSED, table.c.updated_at < cutoff)
+            .order_by(table.c.updated_at, table.c.id)
+            .limit(self.BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        ).mappings().all()
+        if not rows:
+            session.rollback()
+            return 0, 0
+
+        try:
+            by_month: Dict[str, List[Mapping[str, Any]]] = defaultdict(list)
+            for row in rows:
+                by_month[archive_month(row)].append(row)
+            files = [
+                write_archive_chunk(self.ARCHIVE_DIR, month, month_rows)
+                for month, month_rows in by_month.items()
+            ]
+
+            stmt = insert(ArchivedDebt).values([
+                {"debt_id": row["debt_id"], "archive_month": archive_month(row)}
+                for row in rows
+            ])
+            session.execute(stmt.on_conflict_do_nothing(index_elements=["debt_id"]))
+            session.execute(delete(table).where(table.c.id.in_([row["id"] for row in rows])))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+        return len(rows), len(files)
@@ -10,10 +10,12 @@ from datetime import datetime
 from uuid import UUID
 import os
 from app.schemas.charge_notification import ChargeNotification
-from app.models import CSVFile, ChargeRow, ChargeStatus
+from app.models import CSVFile, ChargeRow, ChargeStatus, ArchivedDebt
 from app.db import SessionLocal
+from sqlalchemy import func, select
 from sqlalchemy.dialects.postgresql import insert
 from app.tasks import process_charge  # Import the celery task
+from app.services.archiver import ARCHIVE_LOCK_KEY
 
 logging.basicConfig(
     level=logging.INFO,
@@ -92,11 +94,7 @@ class CSVProcessor(FileProcessor):
                     rows_batch.append(row_data)
                     
                     if len(rows_batch) >= batch_size:
-                        stmt = insert(ChargeRow).values(rows_batch)
-                        # Rely on the unique constraint for debt_id to ignore duplicates.
-                        stmt = stmt.on_conflict_do_nothing(index_elements=["debt_id"])
-                        session.execute(stmt)
-                        session.commit()
+                        self._insert_batch(session, rows_batch)
                         stats["processed_rows"] += len(rows_batch)
                         rows_batch = []
                 except Exception as e:
@@ -108,10 +106,7 @@ class CSVProcessor(FileProcessor):
             
             # Insert any remaining rows.
             if rows_batch:
-                stmt = insert(ChargeRow).values(rows_batch)
-                stmt = stmt.on_conflict_do_nothing(index_elements=["debt_id"])
-                session.execute(stmt)
-                session.commit()
+                self._insert_batch(session, rows_batch)
                 stats["processed_rows"] += len(rows_batch)
             
             # Now query all rows for this CSV file that are still pending.
@@ -128,6 +123,30 @@ class CSVProcessor(FileProcessor):
         finally:
             session.close()
 
+    def _insert_batch(self, session, rows_batch: list) -> None:
+        """
+        Bulk insert a batch of charge rows, skipping debts that are already
+        present, either in `charge_rows` or in the archived debt index.
+        """
+        # The archived_debts check and the insert below are separate statements.
+        # Holding the archive lock (shared) for the whole transaction keeps the
+        # archiver from moving a debt from charge_rows to archived_debts in
+        # between, which would let an archived debt be inserted again. Batch
+        # inserts do not block each other.
+        session.execute(select(func.pg_advisory_xact_lock_shared(ARCHIVE_LOCK_KEY)))
+        debt_ids = [row["debt_id"] for row in rows_batch]
+        archived = {
+            debt_id for (debt_id,) in
+            session.query(ArchivedDebt.debt_id).filter(ArchivedDebt.debt_id.in_(debt_ids))
+        }
+        rows = [row for row in rows_batch if row["debt_id"] not in archived]
+        if rows:
+            stmt = insert(ChargeRow).values(rows)
+            # Rely on the unique constraint for debt_id to ignore duplicates.
+            stmt = stmt.on_conflict_do_nothing(index_elements=["debt_id"])
+            session.execute(stmt)
+        session.commit()
+
 
 class ProcessorFactory:
     @staticmethod
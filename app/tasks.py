@@ -1,9 +1,11 @@
 import logging
 from celery import Celery
+from celery.schedules import crontab
 from app.db import SessionLocal
 from app.models import ChargeRow, ChargeStatus
 from app.services.payment_notifier import EmailNotifier
 from app.services.payment_file import PDFGenerator
+from app.services.archiver import ChargeRowArchiver
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +14,14 @@ celery_app = Celery(
     broker="redis://redis:6379/0"
 )
 
+celery_app.conf.beat_schedule = {
+    "archive-processed-charge-rows": {
+        "task": "app.tasks.archive_charge_rows",
+        # Off-peak, so the large deletes do not compete with uploads.
+        "schedule": crontab(hour=3, minute=0),
+    },
+}
+
 @celery_app.task(bind=True, max_retries=3)
 def process_charge(self, charge_id):
     session = SessionLocal()
@@ -45,4 +55,8 @@ def process_charge(self, charge_id):
         logger.error(f"Failed to process charge {charge_id}: {exc}")
         raise self.retry(exc=exc, countdown=60)
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+@celery_app.task
+def archive_charge_rows():
+    return ChargeRowArchiver().run()
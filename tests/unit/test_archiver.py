@@ -0,0 +1,200 @@
+import pytest
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from uuid import UUID, uuid4
+from app.db import SessionLocal
+from app.models import ArchivedDebt, ChargeRow, ChargeStatus, CSVFile
+from app.services import archiver
+from app.services.archiver import ChargeRowArchiver, archive_month, write_archive_chunk
+
+
+def make_row(row_id: str, updated_at: datetime) -> dict:
+    return {
+        "id": UUID(row_id),
+        "csv_file_id": UUID("750e8400-e29b-41d4-a716-446655440000"),
+        "name": "John Doe",
+        "government_id": "11111111111",
+        "email": "john@example.com",
+        "debt_amount": Decimal("1000.00"),
+        "debt_due_date": date(2023, 1, 1),
+        "debt_id": "550e8400-e29b-41d4-a716-446655440000",
+        "status": ChargeStatus.PROCESSED,
+        "error": None,
+        "created_at": updated_at,
+        "updated_at": updated_at,
+    }
+
+
+def read_chunk(path: str) -> list:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh]
+
+
+def archived_debt_ids(archive_dir) -> set:
+    return {
+        record["debt_id"]
+        for path in archive_dir.glob("*/*.ndjson.gz")
+        for record in read_chunk(str(path))
+    }
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("ARCHIVE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def seeded_rows(monkeypatch):
+    """
+    Seed old PROCESSED, recent PROCESSED and old PENDING rows, and return
+    their debt_ids grouped by kind.
+
+    The archiver runs against the shared database, so the retention window is
+    stretched back to the 1920s and the "old" rows are dated 1900. Only the
+    seeded rows can then qualify for archival.
+    """
+    monkeypatch.setenv("ARCHIVE_RETENTION_DAYS", str(365 * 100))
+    session = SessionLocal()
+    csv_file = CSVFile(filename="archive.csv", fingerprint=uuid4().hex)
+    session.add(csv_file)
+    session.commit()
+
+    old = datetime(1900, 1, 15)
+    recent = datetime.utcnow() - timedelta(days=1)
+    debt_ids = {"old_processed": [], "recent_processed": [], "old_pending": []}
+    for kind, status, updated_at, count in [
+        ("old_processed", ChargeStatus.PROCESSED, old, 5),
+        ("recent_processed", ChargeStatus.PROCESSED, recent, 2),
+        ("old_pending", ChargeStatus.PENDING, old, 2),
+    ]:
+        for _ in range(count):
+            debt_id = str(uuid4())
+            session.add(ChargeRow(
+                csv_file_id=csv_file.id,
+                name="John Doe",
+                government_id="11111111111",
+                email="john@example.com",
+                debt_amount=Decimal("1000.00"),
+                debt_due_date=date(2023, 1, 1),
+                debt_id=debt_id,
+                status=status,
+                created_at=updated_at,
+                updated_at=updated_at,
+            ))
+            debt_ids[kind].append(debt_id)
+    session.commit()
+
+    try:
+        yield debt_ids
+    finally:
+        all_ids = [debt_id for ids in debt_ids.values() for debt_id in ids]
+        session.query(ArchivedDebt).filter(ArchivedDebt.debt_id.in_(all_ids)).delete(synchronize_session=False)
+        session.query(CSVFile).filter(CSVFile.id == csv_file.id).delete(synchronize_session=False)
+        session.commit()
+        session.close()
+
+
+def hot_debt_ids(session, debt_ids: list) -> set:
+    return {
+        debt_id for (debt_id,) in
+        session.query(ChargeRow.debt_id).filter(ChargeRow.debt_id.in_(debt_ids))
+    }
+
+
+def index_debt_ids(session, debt_ids: list) -> set:
+    return {
+        debt_id for (debt_id,) in
+        session.query(ArchivedDebt.debt_id).filter(ArchivedDebt.debt_id.in_(debt_ids))
+    }
+
+
+class TestArchiveMonth:
+    def test_uses_updated_at_month(self):
+        row = make_row("150e8400-e29b-41d4-a716-446655440000", datetime(2024, 3, 31, 23, 59))
+        assert archive_month(row) == "2024-03"
+
+
+class TestWriteArchiveChunk:
+    def test_writes_compressed_ndjson(self, tmp_path):
+        row = make_row("150e8400-e29b-41d4-a716-446655440000", datetime(2024, 3, 1, 12, 0))
+
+        path = write_archive_chunk(str(tmp_path), "2024-03", [row])
+
+        assert path.startswith(os.path.join(str(tmp_path), "2024-03"))
+        assert path.endswith(".ndjson.gz")
+        records = read_chunk(path)
+        assert len(records) == 1
+        assert records[0]["status"] == "processed"
+        assert records[0]["debt_amount"] == "1000.00"
+        assert records[0]["debt_due_date"] == "2023-01-01"
+        assert records[0]["updated_at"] == "2024-03-01T12:00:00"
+
+    def test_rewriting_same_batch_is_idempotent(self, tmp_path):
+        rows = [
+            make_row("150e8400-e29b-41d4-a716-446655440000", datetime(2024, 3, 1)),
+            make_row("250e8400-e29b-41d4-a716-446655440000", datetime(2024, 3, 2)),
+        ]
+
+        first = write_archive_chunk(str(tmp_path), "2024-03", rows)
+        second = write_archive_chunk(str(tmp_path), "2024-03", rows)
+
+        assert first == second
+        assert os.listdir(os.path.join(str(tmp_path), "2024-03")) == [os.path.basename(first)]
+        assert len(read_chunk(first)) == 2
+
+
+class TestChargeRowArchiver:
+    def test_archives_only_old_processed_rows(self, archive_dir, seeded_rows):
+        ChargeRowArchiver().run()
+
+        session = SessionLocal()
+        try:
+            kept = seeded_rows["recent_processed"] + seeded_rows["old_pending"]
+            old = seeded_rows["old_processed"]
+            assert hot_debt_ids(session, old) == set()
+            assert hot_debt_ids(session, kept) == set(kept)
+            assert index_debt_ids(session, old) == set(old)
+            assert index_debt_ids(session, kept) == set()
+        finally:
+            session.close()
+
+        assert archived_debt_ids(archive_dir) == set(seeded_rows["old_processed"])
+        assert os.listdir(str(archive_dir)) == ["1900-01"]
+
+    def test_run_batches_until_exhausted(self, archive_dir, seeded_rows, monkeypatch):
+        monkeypatch.setenv("ARCHIVE_BATCH_SIZE", "2")
+
+        stats = ChargeRowArchiver().run()
+
+        assert stats == {"archived_rows": 5, "batches": 3, "files": 3}
+        assert len(list(archive_dir.glob("*/*.ndjson.gz"))) == 3
+
+        session = SessionLocal()
+        try:
+            kept = seeded_rows["recent_processed"] + seeded_rows["old_pending"]
+            assert hot_debt_ids(session, seeded_rows["old_processed"]) == set()
+            assert hot_debt_ids(session, kept) == set(kept)
+        finally:
+            session.close()
+
+    def test_rolls_back_when_delete_fails(self, archive_dir, seeded_rows, monkeypatch):
+        # Fail after the archived_debts insert has been executed, so the
+        # rollback has to undo it.
+        def fail(*args, **kwargs):
+            raise RuntimeError("delete failed")
+        monkeypatch.setattr(archiver, "delete", fail)
+
+        with pytest.raises(RuntimeError, match="delete failed"):
+            ChargeRowArchiver().run()
+
+        session = SessionLocal()
+        try:
+            all_ids = [debt_id for ids in seeded_rows.values() for debt_id in ids]
+            assert hot_debt_ids(session, all_ids) == set(all_ids)
+            assert index_debt_ids(session, all_ids) == set()
+        finally:
+            session.close()
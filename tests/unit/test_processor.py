@@ -2,9 +2,11 @@ import pytest
 from fastapi import UploadFile
 from app.services.processor import ProcessorFactory, CSVProcessor
 from app.schemas.charge_notification import ChargeNotification
+from app.db import SessionLocal
+from app.models import ArchivedDebt, ChargeRow
 from decimal import Decimal
 from datetime import date
-from uuid import UUID
+from uuid import UUID, uuid4
 import io
 
 def create_mock_file(content: str) -> UploadFile:
@@ -119,4 +121,27 @@ class TestCSVProcessor:
         expected_rows = CSVProcessor().BATCH_SIZE + 1
         assert result["total_rows"] == expected_rows
         assert result["processed_rows"] == expected_rows
-        assert result["failed_rows"] == 0 
\ No newline at end of file
+        assert result["failed_rows"] == 0 
+
+    @pytest.mark.asyncio
+    async def test_process_skips_archived_debt(self):
+        debt_id = str(uuid4())
+        session = SessionLocal()
+        session.add(ArchivedDebt(debt_id=debt_id, archive_month="2024-01"))
+        session.commit()
+        try:
+            content = (
+                "name,governmentId,email,debtAmount,debtDueDate,debtId\n"
+                f"John Doe,11111111111,john@example.com,1000.00,2023-01-01,{debt_id}"
+            )
+            processor = CSVProcessor()
+            file = create_mock_file(content)
+
+            result = await processor.process(file)
+
+            assert result["failed_rows"] == 0
+            assert session.query(ChargeRow).filter(ChargeRow.debt_id == debt_id).count() == 0
+        finally:
+            session.query(ArchivedDebt).filter(ArchivedDebt.debt_id == debt_id).delete()
+            session.commit()
+            session.close()